@@ -5,10 +5,12 @@ Uses only Google Places data
 SAVE THIS FILE AS: app.py
 """
 
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import plotly.graph_objects as go
 
 # ============================================================================
 # CONFIGURATION
@@ -20,34 +22,95 @@ st.set_page_config(
     layout="wide"
 )
 
+DATA_PATH = 'childcare_processed.parquet'
+
+# Scored results kept per set of preferences (oldest are evicted first)
+SCORE_CACHE_ENTRIES = 50
+
+# Educational values shown in the sidebar, matched against mentions_* columns
+VALUE_COLUMNS = ['mentions_montessori', 'mentions_play_based', 'mentions_stem', 'mentions_reggio']
+
+# Approaches listed in the results table
+APPROACH_LABELS = {
+    'mentions_montessori': "Montessori",
+    'mentions_play_based': "Play-Based",
+    'mentions_stem': "STEM"
+}
+
+# Only the columns the app uses are loaded from the processed data
+PROVIDER_COLUMNS = [
+    'name', 'address', 'phone', 'website', 'rating', 'review_count',
+    'latitude', 'longitude', 'estimated_price', 'distance_miles'
+] + VALUE_COLUMNS
+
+# Above this many providers, nearby map markers are grouped into clusters
+MAP_CLUSTER_THRESHOLD = 500
+
+# Above this many providers, the map shows a density heatmap instead of markers
+MAP_DENSITY_THRESHOLD = 2000
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def calculate_match_score(row, max_distance, max_budget, values):
-    """Calculate match score for a provider"""
-    score = 0
-    
+def calculate_match_scores(df, max_distance, max_budget, values):
+    """Calculate match scores for all providers at once"""
     # Distance (35 points)
-    if pd.notna(row.get('distance_miles')):
-        if row['distance_miles'] <= max_distance:
-            score += 35 * (1 - row['distance_miles'] / max_distance)
+    distance = df['distance_miles'].to_numpy(dtype=float)
+    dist_score = np.where(distance <= max_distance, 35 * (1 - distance / max_distance), 0.0)
     
     # Price (30 points)
-    if pd.notna(row.get('estimated_price')):
-        if row['estimated_price'] <= max_budget:
-            score += 30 * (1 - row['estimated_price'] / max_budget)
+    price = df['estimated_price'].to_numpy(dtype=float)
+    price_score = np.where(price <= max_budget, 30 * (1 - price / max_budget), 0.0)
     
     # Rating (20 points)
-    if pd.notna(row.get('rating')):
-        score += 20 * (row['rating'] / 5.0)
+    rating_score = 20 * df['rating'].fillna(0).to_numpy(dtype=float) / 5.0
+    
+    score = dist_score + price_score + rating_score
     
     # Values (15 points)
     if values:
-        matches = sum(1 for v in values if row.get(f'mentions_{v}', 0) > 0)
-        score += 15 * (matches / len(values))
+        val_cols = [f'mentions_{v}' for v in values]
+        mentions = df.reindex(columns=val_cols, fill_value=0).to_numpy(dtype=float)
+        score += 15 * (mentions > 0).sum(axis=1) / len(values)
     
-    return min(score, 100)
+    return pd.Series(np.minimum(score, 100), index=df.index)
+
+def describe_approaches(df):
+    """List the educational approaches mentioned in each provider's reviews"""
+    # One vectorized comparison for all providers and approaches
+    mentioned = df.reindex(columns=list(APPROACH_LABELS), fill_value=0).to_numpy() > 0
+    labels = list(APPROACH_LABELS.values())
+    
+    return [', '.join(label for label, hit in zip(labels, row) if hit) for row in mentioned]
+
+@st.cache_data(max_entries=1)
+def load_providers(path, data_version):
+    """
+    Load processed provider data once and reuse it across reruns
+    data_version (the file's modified time) makes a regenerated file load again
+    """
+    return pd.read_parquet(path, columns=PROVIDER_COLUMNS)
+
+@st.cache_data(max_entries=SCORE_CACHE_ENTRIES, ttl=3600)
+def score_providers(_df, data_version, max_distance, max_budget, min_rating, values):
+    """
+    Filter, score and sort providers (cached per set of preferences)
+    The leading underscore stops Streamlit hashing the whole DataFrame on
+    every rerun; data_version identifies which data it holds instead
+    """
+    # Filter results first so only qualifying providers get scored
+    mask = (
+        (_df['distance_miles'] <= max_distance * 1.2) &  # Allow 20% over
+        (_df['rating'].fillna(0) >= min_rating)
+    )
+    filtered_df = _df.loc[mask].copy()
+    
+    # Calculate match scores
+    filtered_df['match_score'] = calculate_match_scores(filtered_df, max_distance, max_budget, values)
+    
+    # Sort by match score
+    return filtered_df.sort_values('match_score', ascending=False)
 
 # ============================================================================
 # MAIN APP
@@ -60,7 +123,8 @@ def main():
     
     # Check if data exists
     try:
-        df = pd.read_csv('childcare_processed.csv')
+        data_version = os.path.getmtime(DATA_PATH)
+        df = load_providers(DATA_PATH, data_version)
     except FileNotFoundError:
         st.error("""
         ❌ No data found! 
@@ -119,20 +183,8 @@ def main():
     if st.sidebar.checkbox("Reggio Emilia"):
         values.append('reggio')
     
-    # Calculate match scores
-    df['match_score'] = df.apply(
-        lambda row: calculate_match_score(row, max_distance, max_budget, values),
-        axis=1
-    )
-    
-    # Filter results
-    filtered_df = df[
-        (df['distance_miles'] <= max_distance * 1.2) &  # Allow 20% over
-        (df['rating'].fillna(0) >= min_rating)
-    ].copy()
-    
-    # Sort by match score
-    filtered_df = filtered_df.sort_values('match_score', ascending=False)
+    # Score and filter providers
+    filtered_df = score_providers(df, data_version, max_distance, max_budget, min_rating, tuple(values))
     
     # Main content
     st.header("📊 Results")
@@ -167,37 +219,33 @@ def main():
         if len(filtered_df) == 0:
             st.warning("No providers match your criteria. Try adjusting your filters.")
         else:
-            for idx, row in filtered_df.head(10).iterrows():
-                with st.expander(f"**{row['name']}** - Match: {row['match_score']:.0f}/100"):
-                    col1, col2 = st.columns([2, 1])
-                    
-                    with col1:
-                        st.write(f"📍 **Address:** {row['address']}")
-                        st.write(f"📞 **Phone:** {row.get('phone', 'Not available')}")
-                        st.write(f"⭐ **Rating:** {row['rating']:.1f} ({int(row['review_count'])} reviews)")
-                        st.write(f"💵 **Est. Price:** ${row['estimated_price']:.0f}/month")
-                        st.write(f"🚗 **Distance:** {row['distance_miles']:.1f} miles")
-                        
-                        # Show matching values
-                        matching_values = []
-                        if row.get('mentions_montessori', 0) > 0:
-                            matching_values.append("Montessori")
-                        if row.get('mentions_play_based', 0) > 0:
-                            matching_values.append("Play-Based")
-                        if row.get('mentions_stem', 0) > 0:
-                            matching_values.append("STEM")
-                        
-                        if matching_values:
-                            st.write(f"📚 **Approach:** {', '.join(matching_values)}")
-                    
-                    with col2:
-                        # Progress bar for match score
-                        st.progress(row['match_score'] / 100)
-                        st.caption(f"Match: {row['match_score']:.0f}/100")
-                        
-                        # Website link
-                        if pd.notna(row.get('website')) and row.get('website'):
-                            st.link_button("🌐 Visit Website", row['website'])
+            top_df = filtered_df.head(10).copy()
+            top_df['approach'] = describe_approaches(top_df)
+            
+            # One table widget instead of an expander per provider
+            display_columns = [
+                'name', 'match_score', 'address', 'phone', 'rating', 'review_count',
+                'estimated_price', 'distance_miles', 'approach', 'website'
+            ]
+            st.dataframe(
+                top_df[display_columns],
+                column_config={
+                    'name': "Provider",
+                    'match_score': st.column_config.ProgressColumn(
+                        "Match", min_value=0, max_value=100, format="%.0f"
+                    ),
+                    'address': "📍 Address",
+                    'phone': "📞 Phone",
+                    'rating': st.column_config.NumberColumn("⭐ Rating", format="%.1f"),
+                    'review_count': st.column_config.NumberColumn("Reviews", format="%d"),
+                    'estimated_price': st.column_config.NumberColumn("💵 Est. Price", format="$%.0f/mo"),
+                    'distance_miles': st.column_config.NumberColumn("🚗 Distance", format="%.1f mi"),
+                    'approach': "📚 Approach",
+                    'website': st.column_config.LinkColumn("🌐 Website")
+                },
+                hide_index=True,
+                use_container_width=True
+            )
     
     # TAB 2: Map
     with tab2:
@@ -206,21 +254,51 @@ def main():
         map_data = filtered_df[['latitude', 'longitude', 'name', 'rating', 'match_score']].dropna()
         
         if len(map_data) > 0:
-            fig = px.scatter_mapbox(
-                map_data,
-                lat='latitude',
-                lon='longitude',
-                hover_name='name',
-                hover_data={'rating': ':.1f', 'match_score': ':.0f'},
-                color='match_score',
-                size='match_score',
-                color_continuous_scale='RdYlGn',
-                zoom=10,
-                height=600
-            )
+            latitude = map_data['latitude'].to_numpy()
+            longitude = map_data['longitude'].to_numpy()
+            match_score = map_data['match_score'].to_numpy()
+            
+            # One trace built straight from arrays (skips Plotly Express preprocessing)
+            if len(map_data) > MAP_DENSITY_THRESHOLD:
+                # Too many markers to draw smoothly - show match score density instead
+                st.caption(f"Showing match score density for {len(map_data)} providers")
+                trace = go.Densitymapbox(
+                    lat=latitude,
+                    lon=longitude,
+                    z=match_score,
+                    radius=20,
+                    colorscale='RdYlGn',
+                    colorbar=dict(title='Match Score')
+                )
+            else:
+                trace = go.Scattermapbox(
+                    lat=latitude,
+                    lon=longitude,
+                    mode='markers',
+                    marker=dict(
+                        size=match_score / 5 + 4,
+                        color=match_score,
+                        colorscale='RdYlGn',
+                        colorbar=dict(title='Match Score')
+                    ),
+                    text=map_data['name'].to_numpy(),
+                    customdata=np.column_stack([map_data['rating'].to_numpy(), match_score]),
+                    hovertemplate=(
+                        "<b>%{text}</b><br>Rating: %{customdata[0]:.1f}"
+                        "<br>Match: %{customdata[1]:.0f}<extra></extra>"
+                    ),
+                    # Group nearby markers into clusters for large result sets;
+                    # clusters split back into individual providers as you zoom in
+                    cluster=dict(enabled=len(map_data) > MAP_CLUSTER_THRESHOLD, maxzoom=14)
+                )
+            
+            fig = go.Figure(trace)
             
             fig.update_layout(
                 mapbox_style="open-street-map",
+                mapbox_zoom=10,
+                mapbox_center={"lat": latitude.mean(), "lon": longitude.mean()},
+                height=600,
                 margin={"r": 0, "t": 0, "l": 0, "b": 0}
             )
             
@@ -5,32 +5,83 @@ Complete end-to-end project using just one data source
 SAVE THIS FILE AS: collect_data.py
 """
 
+import os
 import requests
 import pandas as pd
 import numpy as np
+import numexpr as ne
 import time
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Union
 import json
+from collections import Counter
 from tqdm import tqdm
 
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is a compiled extension; fall back to str.count
+    ahocorasick = None
+
 # ============================================================================
 # STEP 1: DATA COLLECTION FROM GOOGLE PLACES
 # ============================================================================
 
+class RateLimiter:
+    """
+    Token bucket rate limiter shared by all worker threads
+    Keeps parallel API calls under a requests-per-second budget
+    """
+    
+    def __init__(self, requests_per_second: float):
+        self.rate = requests_per_second
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        """Block until a request is allowed"""
+        with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(1.0, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                time.sleep((1 - self.tokens) / self.rate)
+
 class SimpleChildcareCollector:
     """
     Collect childcare data using Google Places API
     This is your ONLY data source - no state databases needed!
     """
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, max_workers: int = 10, requests_per_second: float = 10,
+                 cache_dir: Optional[str] = 'google_places_cache', cache_days: int = 30):
         """
         Get your free API key from: https://console.cloud.google.com/
         Free tier: $200/month credit = ~4000 searches
+        
+        Args:
+            api_key: Google Places API key
+            max_workers: number of detail requests to run in parallel
+            requests_per_second: API rate limit shared by all workers
+            cache_dir: folder for cached place details (None to disable)
+            cache_days: how long cached place details stay valid
         """
         self.api_key = api_key
         self.base_url = "https://maps.googleapis.com/maps/api/place"
-        self.session = requests.Session()
+        self.session = requests.Session()  # Keeps connections alive between requests
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.cache_dir = cache_dir
+        self.cache_seconds = cache_days * 86400
+        
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
         
     def search_childcare_in_area(self, location: tuple, radius_miles: int = 10, 
                                   query: str = "childcare") -> List[Dict]:
@@ -80,11 +131,44 @@ class SimpleChildcareCollector:
         print(f"Found {len(providers)} providers in area")
         return providers
     
+    def _cache_path(self, place_id: str) -> str:
+        return os.path.join(self.cache_dir, f"{place_id}.json")
+    
+    def _load_cached_details(self, place_id: str) -> Optional[Dict]:
+        """Return cached details for a place, or None if missing/expired"""
+        if not self.cache_dir:
+            return None
+        
+        path = self._cache_path(place_id)
+        try:
+            if time.time() - os.path.getmtime(path) > self.cache_seconds:
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_cached_details(self, place_id: str, details: Dict):
+        """Write details to the cache (via a temp file so readers never see half a file)"""
+        if not self.cache_dir:
+            return
+        
+        path = self._cache_path(place_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(details, f)
+        os.replace(tmp_path, path)
+    
     def get_detailed_info(self, place_id: str) -> Dict:
         """
         Get detailed information for a specific provider
         This is where you get reviews, photos, hours, etc.
+        Results are cached on disk, so re-runs don't pay for the same place twice
         """
+        cached = self._load_cached_details(place_id)
+        if cached is not None:
+            return cached
+        
         url = f"{self.base_url}/details/json"
         params = {
             'place_id': place_id,
@@ -94,10 +178,12 @@ class SimpleChildcareCollector:
             'key': self.api_key
         }
         
+        self.rate_limiter.wait()
         response = self.session.get(url, params=params)
         data = response.json()
         
         if data['status'] == 'OK':
+            self._save_cached_details(place_id, data['result'])
             return data['result']
         return {}
     
@@ -116,17 +202,20 @@ class SimpleChildcareCollector:
             print("No providers found!")
             return pd.DataFrame()
         
-        # Step 2: Get detailed info for each
+        # Step 2: Get detailed info for each (in parallel)
+        providers = [provider for provider in providers if provider.get('place_id')]
+        place_ids = [provider['place_id'] for provider in providers]
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            details_list = list(tqdm(
+                executor.map(self.get_detailed_info, place_ids),
+                total=len(place_ids),
+                desc="Getting details"
+            ))
+        
         detailed_providers = []
         
-        for provider in tqdm(providers, desc="Getting details"):
-            place_id = provider.get('place_id')
-            if not place_id:
-                continue
-            
-            # Get full details
-            details = self.get_detailed_info(place_id)
-            
+        for provider, place_id, details in zip(providers, place_ids, details_list):
             if details:
                 # Combine basic + detailed info
                 combined = {
@@ -140,12 +229,11 @@ class SimpleChildcareCollector:
                     'latitude': details.get('geometry', {}).get('location', {}).get('lat'),
                     'longitude': details.get('geometry', {}).get('location', {}).get('lng'),
                     'business_status': details.get('business_status', 'UNKNOWN'),
-                    'reviews': details.get('reviews', [])
+                    'reviews': details.get('reviews', []),
+                    'reviews_text': FeatureEngineer.combine_review_text(details.get('reviews', []))
                 }
                 
                 detailed_providers.append(combined)
-            
-            time.sleep(0.1)  # Rate limiting
         
         # Convert to DataFrame
         df = pd.DataFrame(detailed_providers)
@@ -157,87 +245,119 @@ class SimpleChildcareCollector:
 # STEP 2: FEATURE ENGINEERING FROM GOOGLE DATA
 # ============================================================================
 
+# Review keywords, grouped by the feature they count towards
+REVIEW_KEYWORDS = {
+    # Educational philosophy keywords
+    'mentions_montessori': ['montessori'],
+    'mentions_reggio': ['reggio'],
+    'mentions_play_based': ['play-based', 'play based', 'child-led'],
+    'mentions_stem': ['stem'],
+    
+    # Quality indicators from reviews
+    'mentions_clean': ['clean'],
+    'mentions_safe': ['safe'],
+    'mentions_caring': ['caring', 'nurturing'],
+    'mentions_educational': ['educational', 'learning'],
+    
+    # Price indicators
+    'mentions_affordable': ['affordable', 'reasonable'],
+    'mentions_expensive': ['expensive', 'pricey'],
+    
+    # Sentiment
+    'positive_keywords_count': ['excellent', 'amazing', 'wonderful', 'great', 'love', 'best', 'professional'],
+    'negative_keywords_count': ['poor', 'bad', 'terrible', 'disappointed', 'worst', 'unprofessional'],
+}
+
+# Philosophy features are 1/0 flags instead of counts
+FLAG_FEATURES = ['mentions_montessori', 'mentions_reggio', 'mentions_play_based', 'mentions_stem']
+
+ALL_KEYWORDS = [keyword for keywords in REVIEW_KEYWORDS.values() for keyword in keywords]
+
+# Aho-Corasick automaton: finds every keyword in a single pass over the text,
+# including keywords inside other keywords ('professional' in 'unprofessional')
+if ahocorasick is not None:
+    KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for keyword in ALL_KEYWORDS:
+        KEYWORD_AUTOMATON.add_word(keyword, keyword)
+    KEYWORD_AUTOMATON.make_automaton()
+
 class FeatureEngineer:
     """
     Extract useful features from Google Places data
     """
     
     @staticmethod
-    def extract_review_features(reviews: List[Dict]) -> Dict:
+    def combine_review_text(reviews: List[Dict]) -> str:
+        """Combine all review text into one lowercase string"""
+        return ' '.join([r.get('text', '').lower() for r in reviews])
+    
+    @staticmethod
+    def extract_review_features(reviews: List[Dict], all_text: Optional[str] = None) -> Dict:
         """
         Extract features from review text using simple keyword analysis
         This replaces needing a separate "values" dataset!
+        Pass all_text if the combined review text is already computed
         """
         if not reviews:
-            return {
-                'mentions_clean': 0,
-                'mentions_safe': 0,
-                'mentions_caring': 0,
-                'mentions_educational': 0,
-                'mentions_montessori': 0,
-                'mentions_play_based': 0,
-                'mentions_affordable': 0,
-                'mentions_expensive': 0,
-                'negative_keywords_count': 0,
-                'positive_keywords_count': 0,
-                'avg_review_length': 0
-            }
-        
-        # Combine all review text
-        all_text = ' '.join([r.get('text', '').lower() for r in reviews])
-        
-        # Educational philosophy keywords
-        features = {
-            'mentions_montessori': 1 if 'montessori' in all_text else 0,
-            'mentions_reggio': 1 if 'reggio' in all_text else 0,
-            'mentions_play_based': 1 if any(word in all_text for word in ['play-based', 'play based', 'child-led']) else 0,
-            'mentions_stem': 1 if 'stem' in all_text else 0,
-            
-            # Quality indicators from reviews
-            'mentions_clean': all_text.count('clean'),
-            'mentions_safe': all_text.count('safe'),
-            'mentions_caring': all_text.count('caring') + all_text.count('nurturing'),
-            'mentions_educational': all_text.count('educational') + all_text.count('learning'),
-            
-            # Price indicators
-            'mentions_affordable': all_text.count('affordable') + all_text.count('reasonable'),
-            'mentions_expensive': all_text.count('expensive') + all_text.count('pricey'),
-            
-            # Sentiment
-            'positive_keywords_count': sum([
-                all_text.count(word) for word in 
-                ['excellent', 'amazing', 'wonderful', 'great', 'love', 'best', 'professional']
-            ]),
-            'negative_keywords_count': sum([
-                all_text.count(word) for word in 
-                ['poor', 'bad', 'terrible', 'disappointed', 'worst', 'unprofessional']
-            ]),
-            
-            'avg_review_length': np.mean([len(r.get('text', '')) for r in reviews])
-        }
+            features = {feature: 0 for feature in REVIEW_KEYWORDS}
+            features['avg_review_length'] = 0
+            return features
+        
+        if all_text is None:
+            all_text = FeatureEngineer.combine_review_text(reviews)
+        keyword_counts = FeatureEngineer.count_keywords(all_text)
+        
+        features = {}
+        for feature, keywords in REVIEW_KEYWORDS.items():
+            count = sum(keyword_counts[kw] for kw in keywords)
+            if feature in FLAG_FEATURES:
+                count = 1 if count > 0 else 0
+            features[feature] = count
+        
+        features['avg_review_length'] = np.mean([len(r.get('text', '')) for r in reviews])
         
         return features
     
     @staticmethod
-    def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-        """Calculate distance in miles using Haversine formula"""
-        from math import radians, sin, cos, sqrt, asin
+    def count_keywords(text: str) -> Counter:
+        """
+        Count how often each review keyword appears in text
+        Uses the Aho-Corasick automaton when pyahocorasick is installed,
+        otherwise one str.count per keyword (same counts, one pass per keyword)
+        """
+        if ahocorasick is not None:
+            return Counter(keyword for _, keyword in KEYWORD_AUTOMATON.iter(text))
         
+        return Counter({keyword: text.count(keyword) for keyword in ALL_KEYWORDS})
+    
+    @staticmethod
+    def calculate_distance(lat1: Union[float, np.ndarray], lon1: Union[float, np.ndarray],
+                           lat2: Union[float, np.ndarray], lon2: Union[float, np.ndarray]
+                           ) -> Union[float, np.ndarray]:
+        """
+        Calculate distance in miles using Haversine formula
+        Works on single coordinates (returns a float) or whole NumPy arrays at once
+        """
         R = 3959  # Earth radius in miles
-        lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
+        lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+        
+        # numexpr evaluates each expression in one pass, without temporary arrays
+        a = ne.evaluate('sin((lat2 - lat1)/2)**2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1)/2)**2')
         
-        a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-        c = 2 * asin(sqrt(a))
+        distance = ne.evaluate('R * 2 * arcsin(sqrt(a))')
         
-        return R * c
+        # numexpr always returns an array; give scalar inputs a plain float back
+        return float(distance) if distance.ndim == 0 else distance
     
     @staticmethod
-    def estimate_price_from_reviews(reviews: List[Dict], rating: float) -> float:
+    def estimate_price_from_reviews(reviews: List[Dict], rating: float,
+                                    affordable_count: Optional[int] = None,
+                                    expensive_count: Optional[int] = None) -> float:
         """
         Estimate price category from reviews and rating
         Returns estimated monthly price
+        Pass the affordable/expensive keyword counts if they are already known
+        (e.g. from extract_review_features) to skip scanning the reviews again
         """
         if not reviews:
             # Use rating as rough proxy (higher rated = higher price)
@@ -246,11 +366,12 @@ class FeatureEngineer:
                 return base_price + (rating - 3.5) * 200
             return base_price
         
-        all_text = ' '.join([r.get('text', '').lower() for r in reviews])
-        
-        # Look for price mentions
-        affordable_count = all_text.count('affordable') + all_text.count('reasonable')
-        expensive_count = all_text.count('expensive') + all_text.count('pricey')
+        if affordable_count is None or expensive_count is None:
+            all_text = FeatureEngineer.combine_review_text(reviews)
+            
+            # Look for price mentions (only the four price keywords, not the full keyword set)
+            affordable_count = sum(all_text.count(kw) for kw in REVIEW_KEYWORDS['mentions_affordable'])
+            expensive_count = sum(all_text.count(kw) for kw in REVIEW_KEYWORDS['mentions_expensive'])
         
         # Base estimate
         base_price = 1200
@@ -272,30 +393,44 @@ class FeatureEngineer:
     def engineer_all_features(self, df: pd.DataFrame, user_location: tuple) -> pd.DataFrame:
         """
         Add all engineered features to dataframe
+        The raw reviews column is dropped once its features are extracted
         """
         print("\nEngineering features from Google data...")
         
         # Distance from user
-        df['distance_miles'] = df.apply(
-            lambda row: self.calculate_distance(
-                user_location[0], user_location[1],
-                row['latitude'], row['longitude']
-            ) if pd.notna(row['latitude']) else 999,
-            axis=1
-        )
+        lat = df['latitude'].to_numpy(dtype=float)
+        lon = df['longitude'].to_numpy(dtype=float)
+        distance = self.calculate_distance(user_location[0], user_location[1], lat, lon)
+        df['distance_miles'] = np.where(np.isnan(lat), 999.0, distance)
+        
+        # Combined review text (already built during collection, except for demo data)
+        reviews = df['reviews'].tolist()
+        if 'reviews_text' in df.columns:
+            reviews_text = df['reviews_text'].tolist()
+        else:
+            reviews_text = [self.combine_review_text(r) for r in reviews]
         
         # Review-based features
-        review_features = df['reviews'].apply(self.extract_review_features)
-        review_df = pd.DataFrame(review_features.tolist())
+        review_features = [
+            self.extract_review_features(r, text)
+            for r, text in zip(reviews, reviews_text)
+        ]
+        review_df = pd.DataFrame(review_features, index=df.index)
         df = pd.concat([df, review_df], axis=1)
         
-        # Price estimation
-        df['estimated_price'] = df.apply(
-            lambda row: self.estimate_price_from_reviews(
-                row['reviews'], row['rating']
-            ),
-            axis=1
-        )
+        # Price estimation (reuses the price keyword counts found above)
+        df['estimated_price'] = [
+            self.estimate_price_from_reviews(r, rating, affordable, expensive)
+            for r, rating, affordable, expensive in zip(
+                reviews,
+                df['rating'].tolist(),
+                review_df['mentions_affordable'].tolist(),
+                review_df['mentions_expensive'].tolist()
+            )
+        ]
+        
+        # Raw reviews are no longer needed - keep only numeric/short text columns
+        df = df.drop(columns=['reviews', 'reviews_text'], errors='ignore')
         
         # Quality score (combining rating and review sentiment)
         df['quality_score'] = (
@@ -304,6 +439,12 @@ class FeatureEngineer:
              (df['positive_keywords_count'] + df['negative_keywords_count'] + 1)) * 0.4  # 40% to sentiment
         )
         
+        # Downcast to smaller dtypes (halves memory and file size)
+        for col in ['rating', 'distance_miles', 'estimated_price', 'quality_score']:
+            df[col] = df[col].astype(np.float32)
+        for col in df.filter(like='mentions_').columns:
+            df[col] = df[col].fillna(0).clip(upper=255).astype(np.uint8)
+        
         print(f"✓ Added {len(review_df.columns) + 3} engineered features")
         
         return df
@@ -319,41 +460,39 @@ class SimpleRecommender:
     """
     
     @staticmethod
-    def calculate_match_score(row: pd.Series, preferences: Dict) -> float:
+    def calculate_match_scores(df: pd.DataFrame, preferences: Dict) -> pd.Series:
         """
-        Calculate how well a provider matches user preferences
-        Returns score 0-100
+        Calculate how well each provider matches user preferences
+        Returns scores 0-100
         """
-        score = 0
+        max_distance = preferences['max_distance']
+        max_budget = preferences['max_budget']
         
         # 1. Distance Score (35 points)
-        if pd.notna(row['distance_miles']):
-            if row['distance_miles'] <= preferences['max_distance']:
-                score += 35 * (1 - row['distance_miles'] / preferences['max_distance'])
+        distance = df['distance_miles'].to_numpy(dtype=float)
+        score = np.where(distance <= max_distance, 35 * (1 - distance / max_distance), 0.0)
         
         # 2. Price Score (30 points)
-        if pd.notna(row['estimated_price']):
-            if row['estimated_price'] <= preferences['max_budget']:
-                score += 30 * (1 - row['estimated_price'] / preferences['max_budget'])
-            else:
-                # Penalty for over budget
-                score += max(0, 30 * (1 - (row['estimated_price'] - preferences['max_budget']) / preferences['max_budget']))
+        price = df['estimated_price'].to_numpy(dtype=float)
+        price_score = np.where(
+            price <= max_budget,
+            30 * (1 - price / max_budget),
+            # Penalty for over budget
+            np.clip(30 * (1 - (price - max_budget) / max_budget), 0, None)
+        )
+        score += np.nan_to_num(price_score)
         
         # 3. Rating Score (20 points)
-        if pd.notna(row['rating']):
-            score += 20 * (row['rating'] / 5.0)
+        score += 20 * df['rating'].fillna(0).to_numpy(dtype=float) / 5.0
         
         # 4. Values Match (15 points)
-        values_score = 0
-        for value in preferences.get('values', []):
-            col_name = f'mentions_{value}'
-            if col_name in row and row[col_name] > 0:
-                values_score += 1
-        
-        if preferences.get('values'):
-            score += 15 * (values_score / len(preferences['values']))
+        values = preferences.get('values', [])
+        if values:
+            val_cols = [f'mentions_{v}' for v in values]
+            mentions = df.reindex(columns=val_cols, fill_value=0).to_numpy(dtype=float)
+            score += 15 * (mentions > 0).sum(axis=1) / len(values)
         
-        return min(score, 100)
+        return pd.Series(np.minimum(score, 100), index=df.index)
     
     def recommend(self, df: pd.DataFrame, preferences: Dict, top_n: int = 10) -> pd.DataFrame:
         """
@@ -365,10 +504,7 @@ class SimpleRecommender:
         print(f"  Values: {preferences.get('values', [])}")
         
         # Calculate match scores
-        df['match_score'] = df.apply(
-            lambda row: self.calculate_match_score(row, preferences),
-            axis=1
-        )
+        df['match_score'] = self.calculate_match_scores(df, preferences)
         
         # Get top recommendations
         recommendations = df.nlargest(top_n, 'match_score')
@@ -452,8 +588,8 @@ def main():
     df = engineer.engineer_all_features(df, user_location)
     
     # Save processed data
-    df.to_csv('childcare_processed.csv', index=False)
-    print("✓ Saved processed data to 'childcare_processed.csv'")
+    df.to_parquet('childcare_processed.parquet', index=False)
+    print("✓ Saved processed data to 'childcare_processed.parquet'")
     
     # Generate recommendations
     print("\n4. GENERATE RECOMMENDATIONS")
@@ -472,15 +608,15 @@ def main():
     print("\n5. TOP RECOMMENDATIONS")
     print("="*70)
     
-    for idx, row in recommendations.iterrows():
-        print(f"\n#{recommendations.index.get_loc(idx) + 1}. {row['name']}")
-        print(f"   Match Score: {row['match_score']:.1f}/100")
-        print(f"   Rating: {row['rating']:.1f} ⭐ ({int(row['review_count'])} reviews)")
-        print(f"   Distance: {row['distance_miles']:.1f} miles")
-        print(f"   Est. Price: ${row['estimated_price']:.0f}/month")
-        print(f"   Address: {row['address']}")
-        if row.get('website'):
-            print(f"   Website: {row['website']}")
+    for rank, row in enumerate(recommendations.itertuples(index=False), start=1):
+        print(f"\n#{rank}. {row.name}")
+        print(f"   Match Score: {row.match_score:.1f}/100")
+        print(f"   Rating: {row.rating:.1f} ⭐ ({int(row.review_count)} reviews)")
+        print(f"   Distance: {row.distance_miles:.1f} miles")
+        print(f"   Est. Price: ${row.estimated_price:.0f}/month")
+        print(f"   Address: {row.address}")
+        if getattr(row, 'website', None):
+            print(f"   Website: {row.website}")
     
     # Save recommendations
     recommendations.to_csv('top_recommendations.csv', index=False)
@@ -491,7 +627,7 @@ def main():
     print("="*70)
     print("""
 Next steps:
-1. Review 'childcare_processed.csv' to see all features
+1. Review 'childcare_processed.parquet' to see all features
 2. Check 'top_recommendations.csv' for top matches
 3. Customize user_preferences to test different scenarios
 4. Build a Streamlit app using this data (optional)